@@ -5,9 +5,10 @@ Combines consecutive lines from the same author within the same conversation
 into single chunks, making responses more natural.
 """
 
-import sys
 from pathlib import Path
 
+from caprica.output import write_lines
+
 
 def chunk_log(input_path):
     """
@@ -24,46 +25,36 @@ def chunk_log(input_path):
     """
     input_path = Path(input_path)
 
+    cur_id = None
+    cur_time = cur_author = ""
+    cur_parts = []
+
+    def emit():
+        return ",".join((cur_id, cur_time, cur_author, " ... ".join(cur_parts)))
+
     with open(input_path, encoding="utf-8", errors="replace") as f:
-        log = f.readlines()
-
-    last_author = ""
-    last_id = None
-    current_line = None
-
-    for row in log:
-        row = row.strip()
-        parts = row.split(",", 3)
-
-        if len(parts) < 4:
-            continue
-
-        id_ = parts[0]
-        time_ = parts[1]
-        author = parts[2]
-        words = parts[3]
-
-        if author == last_author and id_ == last_id and current_line is not None:
-            # Same author and conversation, append to current chunk
-            current_line["words"] += f" ... {words}"
-        else:
-            # New author or conversation, yield previous and start new
-            if current_line is not None:
-                yield f"{current_line['id']},{current_line['time']},{current_line['author']},{current_line['words']}"
-
-            current_line = {
-                "id": id_,
-                "time": time_,
-                "author": author,
-                "words": words,
-            }
-
-        last_author = author
-        last_id = id_
+        for row in f:
+            parts = row.strip().split(",", 3)
+
+            if len(parts) < 4:
+                continue
+
+            id_, time_, author, words = parts
+
+            if cur_id is not None and author == cur_author and id_ == cur_id:
+                # Same author and conversation, append to current chunk
+                cur_parts.append(words)
+            else:
+                # New author or conversation, yield previous and start new
+                if cur_id is not None:
+                    yield emit()
+
+                cur_id, cur_time, cur_author = id_, time_, author
+                cur_parts = [words]
 
     # Yield the last line
-    if current_line is not None:
-        yield f"{current_line['id']},{current_line['time']},{current_line['author']},{current_line['words']}"
+    if cur_id is not None:
+        yield emit()
 
 
 def main():
@@ -82,16 +73,7 @@ def main():
     )
     args = parser.parse_args()
 
-    output = sys.stdout
-    if args.output:
-        output = open(args.output, "w", encoding="utf-8")
-
-    try:
-        for line in chunk_log(args.input):
-            print(line, file=output)
-    finally:
-        if args.output:
-            output.close()
+    write_lines(chunk_log(args.input), args.output)
 
     return 0
 
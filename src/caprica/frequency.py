@@ -5,38 +5,26 @@ Analyzes chat logs to find bigram frequencies and collocations,
 useful for understanding common word pairings in the logs.
 """
 
-import sys
+import re
+from collections import Counter
 from pathlib import Path
 
-import nltk
-from nltk import FreqDist
-from nltk.collocations import BigramCollocationFinder
+from caprica.output import write_lines
 
+# Words or single punctuation marks; far cheaper than nltk.word_tokenize for counting
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
 
-class Line:
-    """Holds chat data."""
+# Single-character tokens that disqualify a bigram
+_PUNCT_DIGITS = frozenset("!\"'#$%&()*+,-./:;<=>?@[]^_`{|}~0123456789")
 
-    def __init__(self, id_, author, words, index):
-        self.id = id_
-        self.author = author
-        self.words = words
-        self.index = index
 
-
-def parse_log(raw_log):
-    """Parse raw log lines into Line objects."""
-    parsed = []
-    for index, row in enumerate(raw_log):
-        row = row.strip()
+def parse_words(raw_log):
+    """Yield just the text column of raw log lines, skipping malformed rows."""
+    for row in raw_log:
         parts = row.split(",", 3)
 
         if len(parts) >= 4:
-            conversation_id = parts[0]
-            author = parts[2]
-            words = parts[3]
-            parsed.append(Line(conversation_id, author, words, index))
-
-    return parsed
+            yield parts[3].strip()
 
 
 def analyze_frequency(input_path, min_freq=2, output_format="bigrams"):
@@ -53,31 +41,25 @@ def analyze_frequency(input_path, min_freq=2, output_format="bigrams"):
     """
     input_path = Path(input_path)
 
+    # Tokenize line by line as the file streams in
+    tokens = []
+    extend = tokens.extend
+    tokenize = _TOKEN_RE.findall
     with open(input_path, encoding="utf-8", errors="replace") as f:
-        log = parse_log(f.readlines())
-
-    # Combine all text
-    all_text = " ".join(line.words for line in log)
-    tokens = nltk.word_tokenize(all_text)
+        for words in parse_words(f):
+            extend(tokenize(words.lower()))
 
     if output_format == "words":
-        fdist = FreqDist(tokens)
-        for word, count in fdist.most_common():
+        for word, count in Counter(tokens).most_common():
             if count >= min_freq:
                 yield f"{word},{count}"
     else:
-        # Bigram analysis
-        finder = BigramCollocationFinder.from_words(tokens)
+        # Bigram analysis, skipping pairs with punctuation or numbers
+        bigram_counts = Counter(zip(tokens, tokens[1:]))
 
-        # Filter out punctuation and numbers
-        punctuation = set("!\"'#$%&()*+,-./:;<=>?@[]^_`{|}~")
-        digits = set("0123456789")
-        finder.apply_word_filter(lambda w: w in punctuation or w in digits)
-        finder.apply_freq_filter(min_freq)
-
-        for ngram, count in finder.ngram_fd.items():
-            if count >= min_freq:
-                the_gram = f"{ngram[0]} {ngram[1]}".replace(",", "")
+        for (first, second), count in bigram_counts.items():
+            if count >= min_freq and first not in _PUNCT_DIGITS and second not in _PUNCT_DIGITS:
+                the_gram = f"{first} {second}".replace(",", "")
                 yield f"{the_gram},{count}"
 
 
@@ -111,23 +93,7 @@ def main():
     )
     args = parser.parse_args()
 
-    # Ensure NLTK data is available
-    try:
-        nltk.word_tokenize("test")
-    except LookupError:
-        print("Downloading required NLTK data...", file=sys.stderr)
-        nltk.download("punkt")
-
-    output = sys.stdout
-    if args.output:
-        output = open(args.output, "w", encoding="utf-8")
-
-    try:
-        for line in analyze_frequency(args.input, args.min_freq, args.format):
-            print(line, file=output)
-    finally:
-        if args.output:
-            output.close()
+    write_lines(analyze_frequency(args.input, args.min_freq, args.format), args.output)
 
     return 0
 
@@ -7,13 +7,17 @@ A chatbot that uses historical chat logs to generate responses using
 sentence similarity through synonym expansion.
 """
 
+import functools
+import re
+import string
+from collections import Counter
 from pathlib import Path
 
 import nltk
-from nltk.collocations import BigramCollocationFinder
 from nltk.corpus import wordnet
 
-bigram_measures = nltk.collocations.BigramAssocMeasures()
+# Words as indexed for search, keeping contractions like "pour'd" whole
+_WORD_RE = re.compile(r"[\w']+")
 
 
 class Line:
@@ -26,9 +30,26 @@ class Line:
         self.lookup = []
         self.index = index
         self.ngrams = []
-        self.synonymscore = 0.0
         self.ngramscore = 0
-        self.used = 0
+
+
+class LogBank:
+    """Holds a parsed chat log as parallel columns, one entry per line."""
+
+    def __init__(self):
+        self.ids = []
+        self.authors = []
+        self.words = []
+        self.word_counts = []
+        self.used = bytearray()
+        self.index = None
+
+    def __len__(self):
+        return len(self.words)
+
+    def line(self, position):
+        """Build a Line for the entry at the given position."""
+        return Line(self.ids[position], self.authors[position], self.words[position], position)
 
 
 def lower_strings(word_list):
@@ -36,6 +57,20 @@ def lower_strings(word_list):
     return [x.lower() for x in word_list]
 
 
+@functools.lru_cache(maxsize=50_000)
+def _syn_lemmas(word):
+    """Return the unique lowercased WordNet lemmas for a word, or the word itself."""
+    sense_list = wordnet.synsets(word)
+
+    if not sense_list:
+        return (word,)
+
+    templist = []
+    for sense in sense_list:
+        templist.extend(lower_strings(sense.lemma_names()))
+    return tuple(dict.fromkeys(templist))
+
+
 def expand_words(words):
     """
     Expand words into lists of synonyms using WordNet.
@@ -43,19 +78,7 @@ def expand_words(words):
     For example, "how about the weather" expands each word into a list
     of synonymous terms to increase matching opportunities.
     """
-    tokens = words.split(" ")
-    lookup = []
-
-    for word in tokens:
-        sense_list = wordnet.synsets(word)
-
-        if sense_list:
-            templist = []
-            for sense in sense_list:
-                templist.extend(lower_strings(sense.lemma_names()))
-            lookup.append(templist)
-        else:
-            lookup.append([word])
+    lookup = [_syn_lemmas(word) for word in words.split(" ")]
 
     # Remove duplicates while preserving structure
     unique_lookup = []
@@ -73,51 +96,61 @@ def expand_words(words):
 
 
 def parse_log(raw_log):
-    """Parse raw log lines into Line objects."""
-    parsed = []
-    for index, row in enumerate(raw_log):
+    """Parse raw log lines into a LogBank."""
+    parsed = LogBank()
+    for row in raw_log:
         row = row.strip()
         parts = row.split(",", 3)
 
         if len(parts) >= 4:
-            conversation_id = parts[0]
             # time = parts[1]  # Available but not currently used
-            author = parts[2]
             words = parts[3]
-            parsed.append(Line(conversation_id, author, words, index))
+            parsed.ids.append(parts[0])
+            parsed.authors.append(parts[2])
+            parsed.words.append(words)
+            parsed.word_counts.append(words.count(" ") + 1)
+            parsed.used.append(0)
 
     return parsed
 
 
+def build_index(bank):
+    """
+    Map each lowercased word to the positions of the bank lines containing it.
+
+    The index is built on first use and cached on the bank.
+    """
+    if bank.index is None:
+        index = {}
+        for position, words in enumerate(bank.words):
+            for word in set(_WORD_RE.findall(words.lower())):
+                index.setdefault(word, []).append(position)
+        bank.index = index
+
+    return bank.index
+
+
 def search(query, bank):
     """
     Search the chat bank for lines matching the query's synonyms.
 
-    Returns unique hits sorted by synonym match score, normalized by line length.
+    Returns a dict mapping the position of each matching line, in log order,
+    to the number of query synonyms it contains normalized by line length.
     """
-    hits = []
-    unique_hits = []
-
-    # Find matches between synonyms
-    for message in bank:
-        for synlists in query.lookup:
-            for synonym in synlists:
-                if synonym in message.words:
-                    message.synonymscore += 1.0
-                    hits.append(message)
-
-    # Find unique hits
-    for i in range(1, len(hits)):
-        if hits[i - 1].index != hits[i].index:
-            unique_hits.append(hits[i])
+    index = build_index(bank)
+    hits = Counter()
 
-    # Normalize scores by line length
-    for hit in unique_hits:
-        word_count = len(hit.words.split(" "))
-        if word_count > 0:
-            hit.synonymscore = hit.synonymscore / float(word_count)
+    # Count synonym matches per distinct line, tokenizing terms like the index
+    for synlists in query.lookup:
+        for synonym in synlists:
+            for term in _WORD_RE.findall(synonym.lower()):
+                positions = index.get(term)
+                if positions:
+                    hits.update(positions)
 
-    return unique_hits
+    # Normalize scores by line length
+    word_counts = bank.word_counts
+    return {position: hits[position] / word_counts[position] for position in sorted(hits)}
 
 
 def rank_ngrams(query, possibilities):
@@ -126,33 +159,32 @@ def rank_ngrams(query, possibilities):
 
     Note: This is computationally expensive and currently disabled in main loop.
     """
-    query_tokens = nltk.wordpunct_tokenize(query.words)
-    query.ngrams = BigramCollocationFinder.from_words(query_tokens)
-    query_score = query.ngrams.score_ngrams(bigram_measures.jaccard)
-    query_sort = sorted(bigram for bigram, score in query_score)
-
-    for message in possibilities:
-        tokens = nltk.wordpunct_tokenize(message.words)
-        message.ngrams = BigramCollocationFinder.from_words(tokens)
+    query.ngrams = _lower_bigrams(query.words)
 
-    import string
+    # Only bigrams that don't open with punctuation count towards the score
+    query_counts = [
+        (bigram, count)
+        for bigram, count in query.ngrams.items()
+        if bigram[0] not in string.punctuation
+    ]
 
     for message in possibilities:
-        ngram_score = message.ngrams.score_ngrams(bigram_measures.jaccard)
-        ngram_sort = sorted(bigram for bigram, score in ngram_score)
-        for ngram in query_sort:
-            for thing in ngram_sort:
-                thing_0 = thing[0].lower()
-                thing_1 = thing[1].lower()
-                ngram_0 = ngram[0].lower()
-                ngram_1 = ngram[1].lower()
-
-                if thing_0 == ngram_0 and thing_1 == ngram_1 and thing_0 not in string.punctuation:
-                    message.ngramscore += 1
+        message.ngrams = _lower_bigrams(message.words)
+        message_counts = message.ngrams
+        for bigram, count in query_counts:
+            if bigram in message_counts:
+                message.ngramscore += count * message_counts[bigram]
 
     return possibilities
 
 
+def _lower_bigrams(words):
+    """Count a line's distinct bigrams by their lowercased form."""
+    tokens = nltk.wordpunct_tokenize(words)
+    pairs = set(zip(tokens, tokens[1:]))
+    return Counter((first.lower(), second.lower()) for first, second in pairs)
+
+
 def get_response(question, response_log):
     """
     Get a response from the log that best matches the question.
@@ -170,20 +202,16 @@ def get_response(question, response_log):
     if not possible_responses:
         return None
 
-    # Find highest scoring response
-    high_score = max(line.synonymscore for line in possible_responses)
-
-    # Choose a high scoring response
-    match_index = 0
-    for line in possible_responses:
-        if line.synonymscore == high_score:
-            match_index = line.index
+    # Choose the highest scoring response, preferring the latest on ties
+    match_index = max(reversed(possible_responses), key=possible_responses.__getitem__)
 
     # Walk forward to find first unused response from log owner
-    for line in response_log[match_index:]:
-        if line.author.lower() != "other" and line.used != 1:
-            response_log[line.index].used = 1
-            return line
+    authors = response_log.authors
+    used = response_log.used
+    for position in range(match_index, len(response_log)):
+        if authors[position].lower() != "other" and not used[position]:
+            used[position] = 1
+            return response_log.line(position)
 
     return None
 
@@ -199,16 +227,16 @@ def load_logs(data_dir=None):
     edgwired_path = data_dir / "edgwired.txt"
     obrigado_path = data_dir / "obrigado.txt"
 
-    edgwired_log = []
-    obrigado_log = []
+    edgwired_log = LogBank()
+    obrigado_log = LogBank()
 
     if edgwired_path.exists():
         with open(edgwired_path, encoding="utf-8", errors="replace") as f:
-            edgwired_log = parse_log(f.readlines())
+            edgwired_log = parse_log(f)
 
     if obrigado_path.exists():
         with open(obrigado_path, encoding="utf-8", errors="replace") as f:
-            obrigado_log = parse_log(f.readlines())
+            obrigado_log = parse_log(f)
 
     return edgwired_log, obrigado_log
 
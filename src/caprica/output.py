@@ -0,0 +1,50 @@
+"""
+Output Helpers
+
+Shared output handling for the command line utilities.
+"""
+
+import sys
+
+_BATCH_SIZE = 4096
+
+
+def write_lines(lines, output_path=None):
+    """
+    Write lines to a file, or to stdout if no path is given.
+
+    Lines are joined and written in batches rather than one print call per
+    line, which matters for multi-megabyte logs. Files are written as UTF-8
+    through a 1 MiB binary buffer; stdout keeps its own encoding.
+
+    Args:
+        lines: Iterable of strings without trailing newlines
+        output_path: Output file path (default: stdout)
+    """
+    if output_path:
+        output = open(output_path, "wb", buffering=1 << 20)
+        write = output.write
+
+        def flush(batch):
+            write(("\n".join(batch) + "\n").encode("utf-8"))
+
+    else:
+        output = None
+        write = sys.stdout.write
+
+        def flush(batch):
+            write("\n".join(batch) + "\n")
+
+    batch = []
+    try:
+        for line in lines:
+            batch.append(line)
+            if len(batch) == _BATCH_SIZE:
+                flush(batch)
+                batch.clear()
+
+        if batch:
+            flush(batch)
+    finally:
+        if output is not None:
+            output.close()
@@ -9,11 +9,20 @@ Sessions are demarcated with either:
 - Start of ollHONDAllo buffer: Sat Sep 29 02:07:00 2001
 """
 
-import re
-import sys
 import time
 from pathlib import Path
 
+from caprica.output import write_lines
+
+# Lines starting with these characters are meta-cruft
+_SKIP_FIRST = frozenset("*-")
+
+# Session markers keyed by first character, as (start prefixes, end prefixes)
+_MARKERS = {
+    "S": (("Start of", "Session Start"), ("Session Close",)),
+    "E": ((), ("End of",)),
+}
+
 
 def parse_aim_log(input_path, my_username="obrigado"):
     """
@@ -33,45 +42,59 @@ def parse_aim_log(input_path, my_username="obrigado"):
 
     chat_id = 0
     unix_time = 0.0
+    user_lower = my_username.lower()
+    # Many sessions share a start time string; only parse each one once
+    mktime_cache = {}
 
     for line in aim_log:
         line = line.strip()
 
         # Skip empty lines and meta-cruft
-        if len(line) == 0 or re.match(r"^\*", line) or re.match(r"^-", line):
+        if not line:
+            continue
+        c0 = line[0]
+        if c0 in _SKIP_FIRST:
             continue
 
-        # Look for conversation start
-        if re.match(r"^Start of", line) or re.match(r"^Session Start", line):
-            chat_id += 1
-            # Extract the date (comes in as "Sep 29 02:14:02 2001")
-            time_string = line[-20:]
-            try:
-                python_time = time.strptime(time_string, "%b %d %H:%M:%S %Y")
-                unix_time = time.mktime(python_time)
-            except ValueError:
-                # If date parsing fails, keep the previous timestamp
-                pass
-
-        # Look for conversation end
-        elif re.match(r"^End of", line) or re.match(r"^Session Close", line):
-            pass
-
-        # Must be a line of conversation
-        else:
-            # Split off the author from the text
-            expanded_line = line.split(":", 1)
-
-            # Make sure it's a legitimate colon-laden line
-            if len(expanded_line) > 1:
-                author = expanded_line[0]
-                text = expanded_line[1].strip()
-
-                # Anonymize the author if it's not me
-                if not re.match(my_username, author, re.IGNORECASE):
-                    author = "other"
-
-                yield f"{chat_id},{unix_time},{author.lower()},{text}"
+        # Only lines opening with "S" or "E" can be session markers
+        markers = _MARKERS.get(c0)
+        if markers is not None:
+            start_prefixes, end_prefixes = markers
+
+            # Look for conversation start
+            if line.startswith(start_prefixes):
+                chat_id += 1
+                # Extract the date (comes in as "Sep 29 02:14:02 2001")
+                time_string = line[-20:]
+                if time_string in mktime_cache:
+                    unix_time = mktime_cache[time_string]
+                else:
+                    try:
+                        python_time = time.strptime(time_string, "%b %d %H:%M:%S %Y")
+                        unix_time = mktime_cache[time_string] = time.mktime(python_time)
+                    except ValueError:
+                        # If date parsing fails, keep the previous timestamp
+                        pass
+                continue
+
+            # Look for conversation end
+            if line.startswith(end_prefixes):
+                continue
+
+        # Must be a line of conversation, so split off the author from the text
+        expanded_line = line.split(":", 1)
+
+        # Make sure it's a legitimate colon-laden line
+        if len(expanded_line) > 1:
+            author = expanded_line[0]
+            text = expanded_line[1].strip()
+
+            # Anonymize the author if it's not me
+            author = author.lower()
+            if not author.startswith(user_lower):
+                author = "other"
+
+            yield f"{chat_id},{unix_time},{author},{text}"
 
 
 def main():
@@ -96,16 +119,7 @@ def main():
     )
     args = parser.parse_args()
 
-    output = sys.stdout
-    if args.output:
-        output = open(args.output, "w", encoding="utf-8")
-
-    try:
-        for line in parse_aim_log(args.input, args.username):
-            print(line, file=output)
-    finally:
-        if args.output:
-            output.close()
+    write_lines(parse_aim_log(args.input, args.username), args.output)
 
     return 0
 